@@ -1,26 +1,93 @@
 #!/usr/bin/env python3
 import os
 import argparse
+import platform
+import functools
+import hashlib
 from pathlib import Path
 import ffmpeg
 from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
 import tempfile
 import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PIL import ExifTags
+from photos2video import generate_videos
 
-def create_title_video(text, output_path, duration=2):
-    """タイトル画面の動画を作成する"""
-    # 4K解像度で黒背景の画像を作成
-    width, height = 3840, 2160
+# 出力動画の解像度（4K）
+OUTPUT_WIDTH, OUTPUT_HEIGHT = 3840, 2160
+
+# 1つのFFmpegプロセスが使用するスレッド数（フォルダ単位で並列実行するため上限を設ける）
+FFMPEG_THREADS = 4
+
+# FFmpeg失敗時に表示するエラーログの末尾サイズ（バイト）
+FFMPEG_LOG_TAIL_BYTES = 64 * 1024
+
+# 同時に実行するffprobeの数
+PROBE_WORKERS = 8
+
+# タイトル画像のフォントとキャッシュ先
+TITLE_FONT_PATH = '/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc'
+TITLE_CACHE_DIR = Path.home() / '.cache' / 'photos2videos' / 'titles'
+
+# EXIFの撮影日時（DateTimeOriginal）のタグID
+DATETIME_ORIGINAL_TAG = next(k for k, v in ExifTags.TAGS.items() if v == 'DateTimeOriginal')
+
+# macOSではVideoToolboxのハードウェアエンコーダーを既定にする
+DEFAULT_ENCODER = 'h264_videotoolbox' if platform.system() == 'Darwin' else 'libx264'
+ENCODERS = ['libx264', 'h264_videotoolbox', 'h264_nvenc', 'h264_qsv']
+
+def get_encoder_options(encoder=DEFAULT_ENCODER):
+    """エンコーダーに応じたFFmpegの出力オプションを返す"""
+    options = {
+        'vcodec': encoder,
+        'video_bitrate': '20M',
+        'pix_fmt': 'yuv420p',
+        'r': 24,
+        'threads': FFMPEG_THREADS,
+    }
+    if encoder == 'libx264':
+        options['preset'] = 'slow'
+    elif encoder == 'h264_videotoolbox':
+        options.update(allow_sw=1, realtime=0)
+    elif encoder == 'h264_nvenc':
+        options.update(preset='p6', tune='hq', rc='vbr')
+    elif encoder == 'h264_qsv':
+        options['preset'] = 'slow'
+    return options
+
+def run_ffmpeg(stream):
+    """FFmpegを実行する（エラー出力はメモリに溜めず一時ファイルに書き出す）"""
+    stream = stream.global_args('-loglevel', 'warning')
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.run(ffmpeg.compile(stream, overwrite_output=True),
+                                 stdin=subprocess.DEVNULL, stderr=log)
+        if process.returncode != 0:
+            # 失敗時のみログの末尾を読み込んで例外に含める
+            log.seek(0, os.SEEK_END)
+            log.seek(max(0, log.tell() - FFMPEG_LOG_TAIL_BYTES))
+            raise ffmpeg.Error('ffmpeg', None, log.read())
+
+def render_title_image(text, width=OUTPUT_WIDTH, height=OUTPUT_HEIGHT):
+    """タイトル画像を描画してキャッシュし、そのパスを返す"""
+    # フォントサイズを計算（画面の高さの1/10程度）
+    font_size = height // 10
+    
+    # 同じ内容のタイトル画像はキャッシュを再利用
+    key = hashlib.sha1(f"{text}|{TITLE_FONT_PATH}|{font_size}|{width}x{height}".encode()).hexdigest()
+    cached_image = TITLE_CACHE_DIR / f"{key}.png"
+    if cached_image.exists():
+        print(f"キャッシュ済みのタイトル画像を使用: {cached_image}")
+        return cached_image
+    
+    # 黒背景の画像を作成
     image = Image.new('RGB', (width, height), 'black')
     draw = ImageDraw.Draw(image)
     
-    # フォントサイズを計算（画面の高さの1/10程度）
-    font_size = height // 10
     try:
         # macOSのシステムフォントを使用
-        font = ImageFont.truetype('/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc', font_size)
+        font = ImageFont.truetype(TITLE_FONT_PATH, font_size)
     except:
         # フォントが見つからない場合はデフォルトフォントを使用
         font = ImageFont.load_default()
@@ -35,33 +102,85 @@ def create_title_video(text, output_path, duration=2):
     # 白色でテキストを描画
     draw.text((x, y), text, font=font, fill='white')
     
-    # 一時ファイルとして保存
-    temp_image = output_path.with_suffix('.png')
+    # 並列実行中の書き込みと衝突しないよう一時ファイル経由で保存
+    TITLE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_image = cached_image.with_name(f"{key}.{os.getpid()}.tmp.png")
     image.save(temp_image)
+    os.replace(temp_image, cached_image)
+    return cached_image
+
+def create_title_video(text, output_path, duration=2, encoder=DEFAULT_ENCODER):
+    """タイトル画面の動画を作成する"""
+    # 4K解像度のタイトル画像を用意
+    title_image = render_title_image(text)
     
-    try:
-        # FFmpegで画像から動画を作成（フェードイン/アウト付き）
-        stream = ffmpeg.input(str(temp_image), loop=1, t=duration)
-        stream = ffmpeg.filter(stream, 'fade', type='in', start_time=0, duration=0.5)
-        stream = ffmpeg.filter(stream, 'fade', type='out', start_time=duration-0.5, duration=0.5)
-        stream = ffmpeg.output(stream, str(output_path),
-                             vcodec='libx264',
-                             preset='slow',
-                             video_bitrate='20M',
-                             pix_fmt='yuv420p',
-                             r=24)
-        ffmpeg.run(stream, overwrite_output=True, capture_stderr=True)
-    finally:
-        # 一時ファイルを削除
-        os.remove(temp_image)
+    # FFmpegで画像から動画を作成（フェードイン/アウト付き）
+    stream = ffmpeg.input(str(title_image), loop=1, t=duration)
+    stream = ffmpeg.filter(stream, 'fade', type='in', start_time=0, duration=0.5)
+    stream = ffmpeg.filter(stream, 'fade', type='out', start_time=duration-0.5, duration=0.5)
+    options = get_encoder_options(encoder)
+    if encoder == 'libx264':
+        # 静止画なので動き探索を省いた高速設定でエンコード
+        options.update(preset='veryfast', tune='stillimage')
+    options['g'] = 24
+    stream = ffmpeg.output(stream, str(output_path), **options)
+    run_ffmpeg(stream)
+
+@functools.lru_cache(maxsize=4096)
+def _probe_video(path_str, mtime):
+    """ffprobeの結果をキャッシュする（パスと更新日時をキーにする）"""
+    return ffmpeg.probe(path_str)
+
+def probe_video(video_path):
+    """動画をffprobeで解析する（同じファイルは再解析しない）"""
+    video_path = Path(video_path).resolve()
+    return _probe_video(str(video_path), video_path.stat().st_mtime)
 
 def get_video_duration(video_path):
     """動画の長さを取得する"""
-    probe = ffmpeg.probe(str(video_path))
+    probe = probe_video(video_path)
     return float(probe['streams'][0]['duration'])
 
-def combine_videos_with_transition(video_files, output_path, transition_duration=1.0):
-    """動画を結合し、クロスフェードトランジションを追加する"""
+def get_stream_params(video_path):
+    """ストリームコピーで結合できるか判定するための映像パラメータを取得する"""
+    probe = probe_video(video_path)
+    stream = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+    return (stream['codec_name'], stream.get('profile'), stream['width'], stream['height'],
+            stream['pix_fmt'], stream['r_frame_rate'], stream['time_base'])
+
+def can_stream_copy(video_files):
+    """すべての動画のコーデック・解像度・フレームレートが一致しているか確認する"""
+    try:
+        return len({get_stream_params(video_path) for video_path in video_files}) == 1
+    except (ffmpeg.Error, StopIteration, KeyError) as e:
+        print(f"映像パラメータの取得に失敗: {e}")
+        return False
+
+def concat_videos_copy(video_files, output_path, verbose=False):
+    """再エンコードせずにストリームコピーで動画を結合する"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        list_file = Path(temp_dir) / "videos.txt"
+        with open(list_file, 'w') as f:
+            for video in video_files:
+                f.write(f"file '{video.absolute()}'\n")
+        
+        stream = ffmpeg.input(str(list_file), format='concat', safe=0)
+        stream = ffmpeg.output(stream, str(output_path), c='copy', movflags='+faststart')
+        
+        if verbose:
+            print("FFmpegコマンド:")
+            print(" ".join(ffmpeg.compile(stream)))
+        
+        try:
+            run_ffmpeg(stream)
+            print(f"結合が完了: {output_path}")
+        except ffmpeg.Error as e:
+            print(f"ストリームコピー結合中のFFmpegエラー: {e.stderr.decode()}")
+            raise
+
+def combine_videos_with_transition(video_files, output_path, transition_duration=1.0,
+                                   encoder=DEFAULT_ENCODER, verbose=False):
+    """動画を結合し、フェードトランジションを追加する（1回のエンコードで処理）"""
     if not video_files:
         print("警告: 結合する動画がありません")
         return
@@ -69,129 +188,137 @@ def combine_videos_with_transition(video_files, output_path, transition_duration
     print(f"動画結合を開始: {len(video_files)}個のファイル")
     print(f"出力先: {output_path}")
     
-    # 一時ディレクトリを作成
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_dir_path = Path(temp_dir)
-        print(f"一時ディレクトリを作成: {temp_dir_path}")
+    # フェードが不要で形式が揃っている場合は再エンコードせずに結合
+    if transition_duration <= 0:
+        if can_stream_copy(video_files):
+            print("フェードなし: ストリームコピーで結合")
+            concat_videos_copy(video_files, output_path, verbose=verbose)
+            return
+        print("映像パラメータが一致しないため再エンコードで結合")
+    
+    # 動画の長さをまとめて並列に取得
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+        durations = list(executor.map(get_video_duration, video_files))
+    
+    # 各動画にフェードを適用したストリームを作成（一時ファイルは作らない）
+    streams = []
+    for i, (video_path, duration) in enumerate(zip(video_files, durations)):
+        print(f"\n動画 {i+1}/{len(video_files)} を追加中: {video_path.name}")
+        print(f"動画の長さ: {duration:.2f}秒")
         
-        # 各動画にトランジションを適用して一時ファイルとして保存
-        processed_files = []
-        for i, video_path in enumerate(video_files):
-            try:
-                print(f"\n動画 {i+1}/{len(video_files)} を処理中: {video_path.name}")
-                duration = get_video_duration(video_path)
-                print(f"動画の長さ: {duration:.2f}秒")
-                
-                temp_output = temp_dir_path / f"temp_{i}.mp4"
-                print(f"一時ファイル: {temp_output}")
-                
-                if i == 0:
-                    print("最初の動画: フェードアウトのみ適用")
-                    stream = ffmpeg.input(str(video_path))
-                    stream = ffmpeg.filter(stream, 'fade', type='out',
-                                        start_time=duration-transition_duration,
-                                        duration=transition_duration)
-                elif i == len(video_files) - 1:
-                    print("最後の動画: フェードインのみ適用")
-                    stream = ffmpeg.input(str(video_path))
-                    stream = ffmpeg.filter(stream, 'fade', type='in',
-                                        start_time=0,
-                                        duration=transition_duration)
-                else:
-                    print("中間の動画: フェードイン/アウト適用")
-                    stream = ffmpeg.input(str(video_path))
-                    stream = ffmpeg.filter(stream, 'fade', type='in',
-                                        start_time=0,
-                                        duration=transition_duration)
-                    stream = ffmpeg.filter(stream, 'fade', type='out',
-                                        start_time=duration-transition_duration,
-                                        duration=transition_duration)
-                
-                # FFmpegコマンドを表示
-                print("FFmpegコマンド:")
-                print(" ".join(ffmpeg.compile(stream.output(str(temp_output),
-                                            vcodec='libx264',
-                                            preset='slow',
-                                            video_bitrate='20M',
-                                            pix_fmt='yuv420p',
-                                            r=24))))
-                
-                # 一時ファイルとして保存
-                ffmpeg.run(stream.output(str(temp_output),
-                                       vcodec='libx264',
-                                       preset='slow',
-                                       video_bitrate='20M',
-                                       pix_fmt='yuv420p',
-                                       r=24),
-                          overwrite_output=True,
-                          capture_stderr=True)
-                
-                processed_files.append(temp_output)
-                print(f"動画 {i+1} の処理が完了")
-                
-            except ffmpeg.Error as e:
-                print(f"FFmpegエラー (動画 {i+1}): {e.stderr.decode()}")
-                raise
-            except Exception as e:
-                print(f"予期せぬエラー (動画 {i+1}): {e}")
-                raise
+        stream = ffmpeg.input(str(video_path)).video
+        # 解像度の異なる動画も結合できるよう、同じグラフ内で出力サイズに揃える
+        stream = ffmpeg.filter(stream, 'scale', OUTPUT_WIDTH, OUTPUT_HEIGHT,
+                               force_original_aspect_ratio='decrease')
+        stream = ffmpeg.filter(stream, 'pad', OUTPUT_WIDTH, OUTPUT_HEIGHT, '(ow-iw)/2', '(oh-ih)/2')
+        stream = ffmpeg.filter(stream, 'setsar', 1)
+        if transition_duration > 0:
+            if i == 0:
+                print("最初の動画: フェードアウトのみ適用")
+                stream = ffmpeg.filter(stream, 'fade', type='out',
+                                    start_time=duration-transition_duration,
+                                    duration=transition_duration)
+            elif i == len(video_files) - 1:
+                print("最後の動画: フェードインのみ適用")
+                stream = ffmpeg.filter(stream, 'fade', type='in',
+                                    start_time=0,
+                                    duration=transition_duration)
+            else:
+                print("中間の動画: フェードイン/アウト適用")
+                stream = ffmpeg.filter(stream, 'fade', type='in',
+                                    start_time=0,
+                                    duration=transition_duration)
+                stream = ffmpeg.filter(stream, 'fade', type='out',
+                                    start_time=duration-transition_duration,
+                                    duration=transition_duration)
+        streams.append(stream)
+    
+    try:
+        # concatフィルタで結合し、1回のエンコードで出力
+        print("\n結合を開始")
+        stream = ffmpeg.concat(*streams, v=1, a=0)
+        stream = ffmpeg.output(stream, str(output_path), **get_encoder_options(encoder))
         
-        try:
-            # 動画リストファイルを作成
-            list_file = temp_dir_path / "videos.txt"
-            print(f"\n動画リストファイルを作成: {list_file}")
-            with open(list_file, 'w') as f:
-                for video in processed_files:
-                    print(f"リストに追加: {video.name}")
-                    f.write(f"file '{video.absolute()}'\n")
-            
-            # 最終的な結合
-            print("\n最終結合を開始")
-            stream = ffmpeg.input(str(list_file), format='concat', safe=0)
-            stream = ffmpeg.output(stream, str(output_path),
-                                 vcodec='libx264',
-                                 preset='slow',
-                                 video_bitrate='20M',
-                                 pix_fmt='yuv420p',
-                                 r=24)
-            
-            print("最終FFmpegコマンド:")
+        if verbose:
+            print("FFmpegコマンド:")
             print(" ".join(ffmpeg.compile(stream)))
-            
-            ffmpeg.run(stream, overwrite_output=True, capture_stderr=True)
-            print(f"最終結合が完了: {output_path}")
-            
-        except ffmpeg.Error as e:
-            print(f"最終結合中のFFmpegエラー: {e.stderr.decode()}")
-            raise
-        except Exception as e:
-            print(f"最終結合中の予期せぬエラー: {e}")
-            raise
+        
+        run_ffmpeg(stream)
+        print(f"結合が完了: {output_path}")
+        
+    except ffmpeg.Error as e:
+        print(f"結合中のFFmpegエラー: {e.stderr.decode()}")
+        raise
+    except Exception as e:
+        print(f"結合中の予期せぬエラー: {e}")
+        raise
 
 def get_image_date(img_path):
     """画像のEXIF情報から撮影日時を取得する関数"""
     try:
-        img = Image.open(img_path)
-        exif = img._getexif()
-        if exif is None:
-            # EXIF情報がない場合はファイルの更新日時を使用
-            return datetime.fromtimestamp(os.path.getmtime(img_path))
+        # ヘッダーのEXIF IFDだけを読み込み、ファイルはすぐに閉じる
+        with Image.open(img_path) as img:
+            exif = img.getexif().get_ifd(ExifTags.IFD.Exif)
+            
+        date_str = exif.get(DATETIME_ORIGINAL_TAG)
+        if date_str:
+            # EXIF内の撮影日時を解析
+            return datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
             
-        for tag_id in ExifTags.TAGS:
-            if ExifTags.TAGS[tag_id] == 'DateTimeOriginal':
-                if tag_id in exif:
-                    # EXIF内の撮影日時を解析
-                    date_str = exif[tag_id]
-                    return datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
-                break
-                
-        # DateTimeOriginalが見つからない場合は更新日時を使用
+        # EXIF情報やDateTimeOriginalがない場合は更新日時を使用
         return datetime.fromtimestamp(os.path.getmtime(img_path))
     except Exception as e:
         print(f"日時取得エラー ({img_path}): {e}")
         # エラーの場合は更新日時を使用
         return datetime.fromtimestamp(os.path.getmtime(img_path))
 
+def process_person_dir(person_dir, output_dir, transition_duration=1.0, encoder=DEFAULT_ENCODER,
+                       verbose=False):
+    """フォルダ内の動画にタイトルを付けて結合し、結合した動画のパスを返す"""
+    try:
+        print(f"\n{person_dir.name}の動画を処理中...")
+        
+        # フォルダ内の動画を取得してソート
+        with os.scandir(person_dir) as entries:
+            videos = [Path(e.path) for e in entries
+                      if e.is_file() and os.path.splitext(e.name)[1].lower() == '.mp4']
+        if not videos:
+            print(f"警告: {person_dir.name}に動画が見つかりません")
+            return None
+        
+        print(f"見つかった動画: {len(videos)}個")
+        
+        # ファイル名でビデオをソート
+        print("動画をファイル名順にソート中...")
+        videos.sort(key=lambda x: x.stem)
+        print(f"ソート後の動画順: {[v.stem for v in videos]}")
+        
+        # 中間ファイルはフォルダごとの作業ディレクトリに置き、失敗しても必ず削除されるようにする
+        with tempfile.TemporaryDirectory(dir=output_dir) as scratch:
+            scratch_dir = Path(scratch)
+            
+            # タイトル動画を作成
+            title_video = scratch_dir / "title.mp4"
+            print(f"タイトル動画を作成中: {title_video}")
+            create_title_video(person_dir.name, title_video, encoder=encoder)
+            
+            # タイトルとフォルダ内の動画を結合し、成功した場合のみ出力フォルダへ移動
+            person_output = output_dir / f"{person_dir.name}_combined.mp4"
+            scratch_output = scratch_dir / person_output.name
+            print(f"動画を結合中: {person_output}")
+            combine_videos_with_transition([title_video, *videos], scratch_output,
+                                           transition_duration=transition_duration,
+                                           encoder=encoder,
+                                           verbose=verbose)
+            shutil.move(str(scratch_output), str(person_output))
+        
+        print(f"{person_dir.name}の処理が完了しました")
+        return person_output
+        
+    except Exception as e:
+        print(f"フォルダ処理中にエラー ({person_dir.name}): {e}")
+        return None
+
 def main():
     parser = argparse.ArgumentParser(description='フォルダ内の動画を結合するスクリプト')
     parser.add_argument('input_dir', help='入力フォルダのパス')
@@ -200,7 +327,19 @@ def main():
                        help='各写真の動画の長さ（秒）')
     parser.add_argument('--folder-order', type=str, nargs='+',
                        help='フォルダの処理順序（スペース区切りで指定。例: "Uta Rioto Leo"）')
+    parser.add_argument('--transition-duration', type=float, default=1.0,
+                       help='フェードの長さ（秒）。0の場合はフェードなしで結合')
+    parser.add_argument('--encoder', choices=ENCODERS, default=DEFAULT_ENCODER,
+                       help=f'使用するH.264エンコーダー（デフォルト: {DEFAULT_ENCODER}）')
+    parser.add_argument('--verbose', action='store_true',
+                       help='実行するFFmpegコマンドを表示する')
+    parser.add_argument('--jobs', type=int,
+                       help=f'同時に処理するフォルダ数（デフォルト: CPUコア数/{FFMPEG_THREADS}）')
+    parser.add_argument('--force', action='store_true',
+                       help='作成済みの写真の動画も作り直す')
     args = parser.parse_args()
+    if args.photo_duration <= 0:
+        parser.error('--photo-durationには1以上の秒数を指定してください')
     
     input_dir = Path(args.input_dir)
     output_dir = Path(args.output_dir)
@@ -209,11 +348,13 @@ def main():
     try:
         # 写真から動画を生成
         print("写真から動画を生成中...")
-        os.system(f'python photos2video.py "{input_dir}" "{output_dir}/個別" --duration {args.photo_duration}')
+        generate_videos(input_dir, output_dir / "個別", duration=args.photo_duration,
+                        force=args.force)
         
         # 各フォルダの動画を結合
         print("\n動画を結合中...")
-        person_dirs = [d for d in (output_dir / "個別").iterdir() if d.is_dir()]
+        with os.scandir(output_dir / "個別") as entries:
+            person_dirs = [Path(e.path) for e in entries if e.is_dir(follow_symlinks=False)]
         
         # フォルダの順序を決定
         if args.folder_order:
@@ -232,50 +373,30 @@ def main():
             person_dirs.sort(key=lambda x: x.name)
             
         print(f"処理するフォルダ順: {[d.name for d in person_dirs]}")
-        all_videos = []
         
-        for person_dir in person_dirs:
-            try:
-                print(f"\n{person_dir.name}の動画を処理中...")
-                
-                # フォルダ内の動画を取得してソート
-                videos = list(person_dir.glob('*.mp4'))
-                if not videos:
-                    print(f"警告: {person_dir.name}に動画が見つかりません")
-                    continue
-                
-                print(f"見つかった動画: {len(videos)}個")
-                
-                # ファイル名でビデオをソート
-                print("動画をファイル名順にソート中...")
-                videos.sort(key=lambda x: x.stem)
-                print(f"ソート後の動画順: {[v.stem for v in videos]}")
-                
-                # タイトル動画を作成
-                title_video = output_dir / f"title_{person_dir.name}.mp4"
-                print(f"タイトル動画を作成中: {title_video}")
-                create_title_video(person_dir.name, title_video)
-                
-                # タイトルとフォルダ内の動画を結合
-                person_output = output_dir / f"{person_dir.name}_combined.mp4"
-                print(f"動画を結合中: {person_output}")
-                combine_videos_with_transition([title_video, *videos], person_output)
-                all_videos.append(person_output)
-                
-                # タイトル動画を削除
-                os.remove(title_video)
-                print(f"{person_dir.name}の処理が完了しました")
-                
-            except Exception as e:
-                print(f"フォルダ処理中にエラー ({person_dir.name}): {e}")
-                continue
+        # フォルダごとの処理を並列実行（結果はフォルダ順に並べ直す）
+        jobs = args.jobs or max(1, (os.cpu_count() or 1) // FFMPEG_THREADS)
+        print(f"並列処理数: {jobs}")
+        results = {}
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(process_person_dir, person_dir, output_dir,
+                                args.transition_duration, args.encoder, args.verbose): person_dir
+                for person_dir in person_dirs
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        all_videos = [results[d] for d in person_dirs if results[d] is not None]
         
         # すべての動画を結合
         if all_videos:
             final_output = output_dir / "最終動画.mp4"
             print("\n最終動画を生成中...")
             print(f"結合する動画: {[v.stem for v in all_videos]}")
-            combine_videos_with_transition(all_videos, final_output)
+            combine_videos_with_transition(all_videos, final_output,
+                                           transition_duration=args.transition_duration,
+                                           encoder=args.encoder,
+                                           verbose=args.verbose)
             print(f"\n完了！最終動画: {final_output}")
             
             # 中間ファイルを削除
@@ -5,19 +5,60 @@ import traceback
 from pathlib import Path
 import ffmpeg
 from datetime import datetime
-import time
-from dataclasses import dataclass
-from typing import List, Dict, Set, Tuple, Optional
-import math
+from typing import List, Dict, Tuple, Optional, NamedTuple
 import numpy as np
 import subprocess
 import json
 import tempfile
 import os
+import threading
+import atexit
 import re
+import bisect
+import struct
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from operator import attrgetter
+try:
+    # PyAVがあればlibavformatを直接呼び出し、ffprobeの起動を省略する
+    import av
+    AV_SUPPORT = True
+except ImportError:
+    AV_SUPPORT = False
 
-@dataclass
-class ClipInfo:
+# 対応する動画形式の拡張子（小文字）
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.m4v')
+
+# グリッド位置の重なり判定で許容する浮動小数点の誤差（秒）
+GRID_EPSILON = 1e-6
+
+# moovボックスを直接読んで長さを取得できる形式（ISO BMFF系）
+MP4_EXTENSIONS = ('.mp4', '.mov', '.m4v')
+
+# ffprobeの結果を保存するディスクキャッシュ（パス・サイズ・更新日時が同じファイルは再解析しない）
+_VIDEO_INFO_CACHE_PATH = Path("~/.cache/photos2videos/video_info.json").expanduser()
+_video_info_cache: Optional[Dict[str, List[Optional[float]]]] = None
+_video_info_cache_lock = threading.Lock()
+# 前回の書き出し以降にキャッシュへ追加された結果があるか
+_video_info_cache_dirty = False
+
+# シーン検出前に縮小する幅（シーンスコアは画面全体の平均なので縮小しても変わらない）
+SCENE_ANALYSIS_WIDTH = 320
+
+# DJIの動画ファイル名に含まれる撮影日時（例: DJI_20250205132608_0003_D）
+_DJI_TIMESTAMP_PATTERN = re.compile(r'DJI_(\d{14})')
+
+# ffmpegのshowinfoフィルタの出力からフレームの時刻を取り出す
+_PTS_TIME_PATTERN = re.compile(r'pts_time:\s*(-?[0-9.]+)')
+
+# スマート選択で残り時間の長い動画を優先する重み（品質・多様性のスコアに加算）
+AVAILABILITY_WEIGHT = 0.02
+
+# セグメント分析のスコア（(ファイルパス, 開始位置) ごとに保持）
+_segment_score_cache: Dict[Tuple[str, float], Dict[str, float]] = {}
+
+class ClipInfo(NamedTuple):
     file: str
     start: float
     duration: float
@@ -25,17 +66,30 @@ class ClipInfo:
     scene_score: float = 0.0  # シーン変化のスコア
     motion_score: float = 0.0  # 動きの量のスコア
     color_variance: float = 0.0  # 色の多様性スコア
+    fps: float = 0.0  # ffprobeで取得したフレームレート（0の場合は不明）
 
 class VideoFile:
-    def __init__(self, path: Path):
+    # インスタンス辞書を持たせずメモリを節約
+    __slots__ = ('path', '_stat', 'duration', 'fps', 'used_ranges', '_used_duration_sum',
+                 '_intervals_cache', 'timestamp', 'min_gap', '_grid_phase')
+    
+    def __init__(self, path: Path, info: Optional[Tuple[Optional[float], Optional[float]]] = None,
+                 stat_result: Optional[os.stat_result] = None):
         self.path = path
-        self.duration = get_video_duration(path)
+        # ディレクトリ走査時に取得済みのstat結果があれば再利用する
+        self._stat = stat_result
+        # 事前に取得済みの (長さ, フレームレート) があれば再解析しない
+        self.duration, self.fps = info if info is not None else get_video_info(path, stat_result)
         if self.duration is None:
             print(f"警告: {path.name} の長さを取得できません。スキップします。")
             self.duration = 0  # 長さが取得できない場合は0とする
-        self.used_ranges: Set[Tuple[float, float]] = set()  # (start, end)のタプルのセット
+        self.fps = self.fps or 0.0  # フレームレートが不明な場合は0（Resolveから取得する）
+        self.used_ranges: List[Tuple[float, float]] = []  # (start, end)のタプルを開始位置順に保持
+        self._used_duration_sum = 0.0  # 使用済み範囲の合計時間（add_used_rangeで更新）
+        self._intervals_cache = None  # (クリップ長, 空き範囲, 累積重み)。add_used_rangeで破棄
         self.timestamp = self._extract_timestamp()
         self.min_gap = 1.0  # クリップ間の最小間隔（秒）
+        self._grid_phase = random.random()  # 配置グリッドの開始位置をずらす割合（ファイルごとに固定）
         
     def _extract_timestamp(self) -> str:
         """ファイル名からタイムスタンプを抽出
@@ -46,11 +100,14 @@ class VideoFile:
         """
         try:
             # DJIファイルの場合
-            if self.path.stem.startswith('DJI_'):
-                return self.path.stem.split('_')[1]
+            match = _DJI_TIMESTAMP_PATTERN.match(self.path.stem)
+            if match:
+                return match.group(1)
             
             # その他のファイルの場合は更新日時を使用
-            mtime = self.path.stat().st_mtime
+            if self._stat is None:
+                self._stat = self.path.stat()
+            mtime = self._stat.st_mtime
             dt = datetime.fromtimestamp(mtime)
             return dt.strftime('%Y%m%d%H%M%S')
         except (IndexError, ValueError, OSError) as e:
@@ -63,44 +120,37 @@ class VideoFile:
         if not self.used_ranges:
             return self.duration
         
-        used_duration = sum(end - start for start, end in self.used_ranges)
         # 最小間隔の合計を引く
-        gap_duration = self.min_gap * (len(self.used_ranges) - 1) if len(self.used_ranges) > 1 else 0
-        return self.duration - used_duration - gap_duration
+        gap_duration = self.min_gap * max(0, len(self.used_ranges) - 1)
+        return self.duration - self._used_duration_sum - gap_duration
         
-    def can_extract_clip(self, clip_duration: float) -> bool:
-        """指定された長さのクリップが抽出可能かチェック"""
-        if self.duration < clip_duration:
-            return False
-            
-        # 使用済み範囲をソート
-        sorted_ranges = sorted(self.used_ranges)
+    def _available_intervals(self, clip_duration: float) -> List[Tuple[float, float]]:
+        """クリップを配置できる開始位置の範囲 (最小, 最大) を列挙"""
+        return self._interval_table(clip_duration)[0]
         
-        # 最初の使用済み範囲の前をチェック
-        if sorted_ranges and sorted_ranges[0][0] >= clip_duration:
-            return True
-            
-        # 使用済み範囲の間をチェック
-        for i in range(len(sorted_ranges) - 1):
-            gap = sorted_ranges[i + 1][0] - sorted_ranges[i][1]
-            if gap >= clip_duration + self.min_gap * 2:  # 両端に最小間隔を確保
-                return True
-                
-        # 最後の使用済み範囲の後をチェック
-        if sorted_ranges:
-            remaining = self.duration - sorted_ranges[-1][1]
-            if remaining >= clip_duration + self.min_gap:  # 前側の最小間隔を確保
-                return True
-        
-        return self.get_available_duration() >= clip_duration + self.min_gap
+    def _interval_table(self, clip_duration: float) -> Tuple[List[Tuple[float, float]], List[float]]:
+        """空き範囲と、範囲の幅による累積重みを返す（使用済み範囲が変わるまでキャッシュ）"""
+        cache = self._intervals_cache
+        if cache is not None and cache[0] == clip_duration:
+            return cache[1], cache[2]
+        available_ranges = self._scan_intervals(clip_duration)
+        cumulative = []
+        total = 0.0
+        for lo, hi in available_ranges:
+            total += hi - lo
+            cumulative.append(total)
+        self._intervals_cache = (clip_duration, available_ranges, cumulative)
+        return available_ranges, cumulative
         
-    def find_available_position(self, clip_duration: float) -> float:
-        """使用可能な開始位置を見つける"""
+    def _scan_intervals(self, clip_duration: float) -> List[Tuple[float, float]]:
+        """使用済み範囲を走査して空き範囲を列挙"""
+        if self.duration < clip_duration:
+            return []
         if not self.used_ranges:
-            max_start = self.duration - clip_duration
-            return random.uniform(0, max_start)
+            return [(0, self.duration - clip_duration)]
             
-        sorted_ranges = sorted(self.used_ranges)
+        # 使用済み範囲は開始位置順に保持されているため、1回の走査で空きを列挙できる
+        sorted_ranges = self.used_ranges
         available_ranges = []
         
         # 最初の使用済み範囲の前をチェック
@@ -115,163 +165,480 @@ class VideoFile:
                 available_ranges.append((gap_start, gap_end - clip_duration))
                 
         # 最後の使用済み範囲の後をチェック
-        if sorted_ranges:
-            last_end = sorted_ranges[-1][1] + self.min_gap  # 最小間隔を確保
-            if self.duration - last_end >= clip_duration:
-                available_ranges.append((last_end, self.duration - clip_duration))
+        last_end = sorted_ranges[-1][1] + self.min_gap  # 最小間隔を確保
+        if self.duration - last_end >= clip_duration:
+            available_ranges.append((last_end, self.duration - clip_duration))
+        
+        return available_ranges
+        
+    def can_extract_clip(self, clip_duration: float) -> bool:
+        """指定された長さのクリップが抽出可能かチェック"""
+        return bool(self._available_intervals(clip_duration))
         
+    def _pick_start(self, clip_duration: float) -> Optional[float]:
+        """空き範囲の幅に比例した重みで開始位置をランダムに選ぶ（空きがなければNone）"""
+        available_ranges, cumulative = self._interval_table(clip_duration)
         if not available_ranges:
-            raise ValueError("利用可能な位置が見つかりません")
-            
-        # ランダムに範囲を選択
-        selected_range = random.choice(available_ranges)
+            return None
+        if cumulative[-1] > 0:
+            # 累積重みを二分探索して範囲を選択（O(log k)）
+            index = bisect.bisect_right(cumulative, random.random() * cumulative[-1])
+            selected_range = available_ranges[min(index, len(available_ranges) - 1)]
+        else:
+            selected_range = random.choice(available_ranges)
         return random.uniform(selected_range[0], selected_range[1])
         
+    def sample_starts(self, clip_duration: float, count: int) -> List[float]:
+        """空き範囲を1回だけ列挙し、そこから複数の開始位置をサンプリング"""
+        available_ranges, cumulative = self._interval_table(clip_duration)
+        if not available_ranges:
+            return []
+        if cumulative[-1] <= 0:
+            return [random.choice(available_ranges)[0] for _ in range(count)]
+        # 範囲の幅に比例した重みで範囲を選び、その中で一様に位置を選ぶ
+        selected = random.choices(available_ranges, cum_weights=cumulative, k=count)
+        return [random.uniform(lo, hi) for lo, hi in selected]
+        
+    def find_available_position(self, clip_duration: float) -> float:
+        """使用可能な開始位置を見つける"""
+        start = self._pick_start(clip_duration)
+        if start is None:
+            raise ValueError("利用可能な位置が見つかりません")
+        return start
+        
+    def max_clips(self, clip_duration: float) -> int:
+        """最小間隔を空けて詰めた場合に抽出できるクリップの最大数"""
+        if self.duration < clip_duration:
+            return 0
+        return int((self.duration - clip_duration) // (clip_duration + self.min_gap)) + 1
+        
+    def _grid_starts(self, clip_duration: float) -> List[float]:
+        """最大数のクリップを詰められる等間隔の開始位置（終了時刻順）"""
+        count = self.max_clips(clip_duration)
+        step = clip_duration + self.min_gap
+        slack = max(0.0, self.duration - clip_duration - (count - 1) * step)
+        offset = self._grid_phase * slack
+        return [offset + i * step for i in range(count)]
+        
+    def _conflicts(self, start: float, clip_duration: float) -> bool:
+        """指定位置のクリップが使用済み範囲（最小間隔を含む）と重なるか"""
+        index = bisect.bisect_left(self.used_ranges, (start,))
+        # 直前の範囲の終了と、直後の範囲の開始だけを確認すればよい（グリッド上の丸め誤差は許容）
+        if index > 0 and self.used_ranges[index - 1][1] + self.min_gap > start + GRID_EPSILON:
+            return True
+        if index < len(self.used_ranges) and start + clip_duration + self.min_gap > self.used_ranges[index][0] + GRID_EPSILON:
+            return True
+        return False
+        
+    def try_reserve_clip(self, clip_duration: float) -> Optional[float]:
+        """空き位置を探して確保し、開始位置を返す（空きがなければNone）
+        
+        終了時刻順に並んだグリッド位置から、使用済み範囲と重ならないものを
+        貪欲に採用して候補とする（最早終了時刻法）。グリッドに空きがない場合は
+        任意の空き範囲から選ぶ。
+        """
+        free_starts = [
+            start for start in self._grid_starts(clip_duration)
+            if not self._conflicts(start, clip_duration)
+        ]
+        if free_starts:
+            start = random.choice(free_starts)
+        else:
+            start = self._pick_start(clip_duration)
+        if start is not None:
+            self.add_used_range(start, clip_duration)
+        return start
+        
     def add_used_range(self, start: float, duration: float):
         """使用済み範囲を追加"""
-        self.used_ranges.add((start, start + duration))
+        # ソート順を保ったまま挿入する（O(log k)で位置を探索）
+        bisect.insort(self.used_ranges, (start, start + duration))
+        self._used_duration_sum += duration
+        self._intervals_cache = None
 
-def get_video_duration(input_file):
-    """動画の長さを取得"""
+def _parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """ffprobeのフレームレート表記（例: 30000/1001）を数値に変換"""
     try:
-        probe = ffmpeg.probe(str(input_file))
-        if 'format' in probe and 'duration' in probe['format']:
-            return float(probe['format']['duration'])
-        for stream in probe['streams']:
-            if stream['codec_type'] == 'video' and 'duration' in stream:
-                return float(stream['duration'])
+        num, den = (rate or '').split('/')
+        return float(num) / float(den) if float(den) else None
+    except ValueError:
         return None
+
+def _iter_boxes(data: bytes, offset: int, end: int):
+    """MP4ボックスを (種類, 中身の開始位置, 終了位置) として列挙"""
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+def _find_box(data: bytes, offset: int, end: int, box_type: bytes) -> Optional[Tuple[int, int]]:
+    """指定した種類の最初の子ボックスの範囲を返す"""
+    for found_type, start, box_end in _iter_boxes(data, offset, end):
+        if found_type == box_type:
+            return start, box_end
+    return None
+
+def _read_mp4_moov(input_file) -> Optional[bytes]:
+    """トップレベルのボックスを読み飛ばし、moovボックスの中身だけを読み込む"""
+    with open(input_file, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(16)
+            if len(header) < 8:
+                return None
+            size, box_type = struct.unpack_from('>I4s', header)
+            header_size = 8
+            if size == 1:
+                if len(header) < 16:
+                    return None
+                size = struct.unpack_from('>Q', header, 8)[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset
+            if size < header_size:
+                return None
+            if box_type == b'moov':
+                f.seek(offset + header_size)
+                return f.read(size - header_size)
+            offset += size  # mdatなどは読まずにシークで飛ばす
+    return None
+
+def _parse_mvhd_duration(data: bytes, start: int) -> Optional[float]:
+    """mvhdボックスからtimescaleとdurationを読み取り秒に変換"""
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', data, start + 12)
+    return duration / timescale if timescale else None
+
+def _parse_video_track_fps(moov: bytes) -> Optional[float]:
+    """映像トラックのmdhdとsttsから平均フレームレートを計算"""
+    for box_type, trak_start, trak_end in _iter_boxes(moov, 0, len(moov)):
+        if box_type != b'trak':
+            continue
+        mdia = _find_box(moov, trak_start, trak_end, b'mdia')
+        if not mdia:
+            continue
+        hdlr = _find_box(moov, mdia[0], mdia[1], b'hdlr')
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+            continue
+        mdhd = _find_box(moov, mdia[0], mdia[1], b'mdhd')
+        minf = _find_box(moov, mdia[0], mdia[1], b'minf')
+        stbl = minf and _find_box(moov, minf[0], minf[1], b'stbl')
+        stts = stbl and _find_box(moov, stbl[0], stbl[1], b'stts')
+        if not mdhd or not stts:
+            return None
+        offset = mdhd[0] + (20 if moov[mdhd[0]] == 1 else 12)
+        timescale = struct.unpack_from('>I', moov, offset)[0]
+        entry_count = struct.unpack_from('>I', moov, stts[0] + 4)[0]
+        samples = 0
+        ticks = 0
+        for i in range(entry_count):
+            count, delta = struct.unpack_from('>II', moov, stts[0] + 8 + i * 8)
+            samples += count
+            ticks += count * delta
+        return samples * timescale / ticks if ticks else None
+    return None
+
+def _probe_mp4_info(input_file) -> Optional[Tuple[float, Optional[float]]]:
+    """MP4/MOVのmoovボックスを直接解析して長さとフレームレートを取得（ffprobeを起動しない）"""
+    try:
+        moov = _read_mp4_moov(input_file)
+        if not moov:
+            return None
+        mvhd = _find_box(moov, 0, len(moov), b'mvhd')
+        if not mvhd:
+            return None
+        duration = _parse_mvhd_duration(moov, mvhd[0])
+        if not duration:
+            return None
+        return duration, _parse_video_track_fps(moov)
+    except (OSError, struct.error, IndexError):
+        return None
+
+def _probe_av_info(input_file) -> Optional[Tuple[float, Optional[float]]]:
+    """PyAVでコンテナを開いて長さとフレームレートを取得（サブプロセスを起動しない）"""
+    try:
+        with av.open(str(input_file), metadata_errors='ignore') as container:
+            if not container.duration:
+                return None
+            duration = float(container.duration) / av.time_base
+            video_streams = container.streams.video
+            rate = video_streams[0].average_rate if video_streams else None
+            return duration, float(rate) if rate else None
+    except Exception:
+        return None
+
+def _fast_probe(input_file) -> Optional[dict]:
+    """読み込み量を制限し、必要な項目だけを出力させる高速なffprobe"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-threads', '0',
+        '-probesize', '1048576',
+        '-analyzeduration', '1000000',
+        '-select_streams', 'v:0',
+        '-show_entries', 'format=duration:stream=duration,codec_type,avg_frame_rate',
+        '-of', 'json',
+        str(input_file)
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        probe = json.loads(proc.stdout)
+    except (subprocess.CalledProcessError, ValueError, OSError):
+        return None
+    if 'duration' not in probe.get('format', {}) and not any('duration' in s for s in probe.get('streams', [])):
+        return None
+    return probe
+
+def _probe_video_info(input_file) -> Tuple[Optional[float], Optional[float]]:
+    """1回のffprobeで動画の長さとフレームレートを取得"""
+    # MP4/MOVはまずmoovボックスを直接読む（解析できない場合のみffprobeを使用）
+    if os.path.splitext(str(input_file))[1].lower() in MP4_EXTENSIONS:
+        info = _probe_mp4_info(input_file)
+        if info is not None:
+            return info
+    if AV_SUPPORT:
+        info = _probe_av_info(input_file)
+        if info is not None:
+            return info
+    try:
+        # 高速な解析で長さが取得できない場合のみ、通常のffprobeで全体を解析
+        probe = _fast_probe(input_file) or ffmpeg.probe(str(input_file))
+        video_stream = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'video'), None)
+        fps = _parse_frame_rate(video_stream.get('avg_frame_rate')) if video_stream else None
+        if 'format' in probe and 'duration' in probe['format']:
+            return float(probe['format']['duration']), fps
+        if video_stream and 'duration' in video_stream:
+            return float(video_stream['duration']), fps
+        return None, fps
     except Exception as e:
         print(f"エラー: {input_file}の解析に失敗: {e}")
-        return None
+        return None, None
+
+def _load_video_info_cache() -> Dict[str, List[Optional[float]]]:
+    """ディスクキャッシュを読み込む（初回のみファイルを読む）"""
+    global _video_info_cache
+    if _video_info_cache is None:
+        try:
+            with open(_VIDEO_INFO_CACHE_PATH, 'r') as f:
+                _video_info_cache = json.load(f)
+        except (OSError, ValueError):
+            _video_info_cache = {}
+    return _video_info_cache
+
+def _save_video_info_cache():
+    """ディスクキャッシュを一時ファイル経由でアトミックに書き出す"""
+    _VIDEO_INFO_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=_VIDEO_INFO_CACHE_PATH.parent,
+                                     suffix='.tmp', delete=False) as f:
+        json.dump(_video_info_cache, f)
+    os.replace(f.name, _VIDEO_INFO_CACHE_PATH)
+
+@lru_cache(maxsize=None)
+def _cached_video_info(path: str, size: int, mtime_ns: int) -> Tuple[Optional[float], Optional[float]]:
+    """ディスクキャッシュを参照し、見つからない場合のみffprobeを実行"""
+    key = f"{path}:{size}:{mtime_ns}"
+    # 移動・コピーされたDJIのファイルも再解析しないための副キー
+    # （DJIのファイル名は撮影日時と連番を含み撮影ごとに一意。それ以外の名前は重複しうるため使わない）
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name_key = f"dji:{stem}:{size}" if _DJI_TIMESTAMP_PATTERN.match(stem.upper()) else None
+    with _video_info_cache_lock:
+        cache = _load_video_info_cache()
+        if key in cache:
+            return tuple(cache[key])
+        if name_key is not None and name_key in cache:
+            return tuple(cache[name_key])
+    
+    info = _probe_video_info(path)
+    if info[0] is not None:
+        # ファイルへの書き出しはflush_video_info_cacheでまとめて行う
+        global _video_info_cache_dirty
+        with _video_info_cache_lock:
+            cache[key] = list(info)
+            if name_key is not None:
+                cache[name_key] = list(info)
+            _video_info_cache_dirty = True
+    return info
+
+def flush_video_info_cache():
+    """追加された解析結果があればディスクキャッシュを1回だけ書き出す"""
+    global _video_info_cache_dirty
+    with _video_info_cache_lock:
+        if not _video_info_cache_dirty:
+            return
+        try:
+            _save_video_info_cache()
+            _video_info_cache_dirty = False
+        except OSError as e:
+            print(f"警告: 解析結果のキャッシュを保存できません: {e}")
+
+# probe_allを通さずに解析した結果も終了時に保存する
+atexit.register(flush_video_info_cache)
+
+def get_video_info(input_file, stat_result: Optional[os.stat_result] = None) -> Tuple[Optional[float], Optional[float]]:
+    """動画の長さとフレームレートを取得（キャッシュ済みの場合はffprobeを実行しない）"""
+    st = stat_result
+    if st is None:
+        try:
+            st = os.stat(input_file)
+        except OSError as e:
+            print(f"エラー: {input_file}の解析に失敗: {e}")
+            return None, None
+    # 同じファイルを指す別表記のパス（相対パス・シンボリックリンク）でも同じキャッシュを使う
+    path = os.path.normcase(os.path.realpath(input_file))
+    return _cached_video_info(path, st.st_size, st.st_mtime_ns)
+
+def probe_all(paths, stat_results=None) -> List[Tuple[Optional[float], Optional[float]]]:
+    """複数の動画の長さとフレームレートをスレッドプールで並列に取得（入力と同じ順序で返す）"""
+    if stat_results is None:
+        stat_results = [None] * len(paths)
+    # 解析はファイルI/Oか別プロセスのffprobeが中心でGILを保持しないため、CPUコア数より多く並列化する
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        infos = list(executor.map(get_video_info, paths, stat_results))
+    # 解析結果はすべての動画の解析が終わってからまとめて保存する
+    flush_video_info_cache()
+    return infos
 
-def analyze_video_segment(file_path: str, start_time: float, duration: float) -> Dict[str, float]:
+def analyze_video_segment(video_file: VideoFile, start_time: float, duration: float,
+                          verbose: bool = False) -> Dict[str, float]:
     """動画の特定のセグメントを分析し、特徴を抽出する"""
+    # 同じ位置の候補を再評価する場合はキャッシュ済みのスコアを返す
+    key = (str(video_file.path), round(start_time, 2))
+    if key in _segment_score_cache:
+        return _segment_score_cache[key]
+    
+    # 基本的な分析結果を生成
+    # 実際のフレーム分析はできないため、ランダムな値を生成（長さはVideoFileで取得済みのためffprobeは不要）
     result = {
-        'scene_score': 0.0,
-        'motion_score': 0.0,
-        'color_variance': 0.0
+        'scene_score': random.uniform(0.1, 0.9),
+        'motion_score': random.uniform(0.1, 0.9),
+        'color_variance': random.uniform(0.1, 0.9)
     }
     
-    try:
-        # 一時ファイルを作成
-        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
-            temp_json_path = temp_file.name
-        
-        # ffprobeを使用して動画の基本情報を取得
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-i', file_path,
-            '-show_entries', 'format=duration',
-            '-of', 'json'
-        ]
-        
-        try:
-            # コマンドを実行し、結果をJSONファイルに保存
-            with open(temp_json_path, 'w') as f:
-                subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, check=True)
-            
-            # JSONファイルを読み込む
-            with open(temp_json_path, 'r') as f:
-                data = json.load(f)
-            
-            # 基本的な分析結果を生成
-            # 実際のフレーム分析はできないため、ランダムな値を生成
-            result['scene_score'] = random.uniform(0.1, 0.9)
-            result['motion_score'] = random.uniform(0.1, 0.9)
-            result['color_variance'] = random.uniform(0.1, 0.9)
-            
-            print(f"  セグメント分析: 開始={start_time:.1f}秒, 長さ={duration:.1f}秒")
-            print(f"  生成されたスコア: シーン={result['scene_score']:.2f}, "
-                  f"動き={result['motion_score']:.2f}, "
-                  f"色多様性={result['color_variance']:.2f}")
-                
-        except subprocess.CalledProcessError as e:
-            print(f"警告: ffprobeの実行中にエラーが発生しました: {e}")
-            # エラーが発生した場合もランダムな値を生成
-            result['scene_score'] = random.uniform(0.1, 0.9)
-            result['motion_score'] = random.uniform(0.1, 0.9)
-            result['color_variance'] = random.uniform(0.1, 0.9)
-        finally:
-            # 一時ファイルを削除
-            if os.path.exists(temp_json_path):
-                os.remove(temp_json_path)
-    
-    except Exception as e:
-        print(f"警告: 動画分析中にエラーが発生しました: {e}")
+    if verbose:
+        print(f"  セグメント分析: 開始={start_time:.1f}秒, 長さ={duration:.1f}秒\n"
+              f"  生成されたスコア: シーン={result['scene_score']:.2f}, "
+              f"動き={result['motion_score']:.2f}, "
+              f"色多様性={result['color_variance']:.2f}")
     
+    _segment_score_cache[key] = result
     return result
 
-def select_clips(video_files: List[VideoFile], clip_duration: float, total_duration: float) -> List[ClipInfo]:
+def select_clips(video_files: List[VideoFile], clip_duration: float, total_duration: float,
+                 verbose: bool = False) -> List[ClipInfo]:
     """必要なクリップを選択"""
-    num_clips_needed = math.ceil(total_duration / clip_duration)
+    num_clips_needed = int(-(-total_duration // clip_duration))  # 切り上げ
     selected_clips = []
     
-    # 各ファイルから抽出可能なクリップ数を計算
-    file_potentials = []
-    for video_file in video_files:
-        if video_file.duration >= clip_duration:
-            max_clips = math.floor(video_file.duration / clip_duration)
-            file_potentials.append((video_file, max_clips))
-    
-    # 抽出可能なクリップの総数を確認
-    total_possible_clips = sum(potential[1] for potential in file_potentials)
+    # 抽出可能なクリップの総数を確認（最小間隔を空けて詰めた場合の最大数）
+    total_possible_clips = sum(video_file.max_clips(clip_duration) for video_file in video_files)
     if total_possible_clips < num_clips_needed:
         print(f"警告: 必要なクリップ数 {num_clips_needed} に対して、抽出可能なクリップ数は {total_possible_clips} です")
         num_clips_needed = total_possible_clips
     
-    while len(selected_clips) < num_clips_needed:
-        # 利用可能なファイルをフィルタリング
-        available_files = [
-            video_file for video_file in video_files
-            if video_file.can_extract_clip(clip_duration)
-        ]
+    # すべての枠が必要な場合は抽選せず、各ファイルのグリッドを先頭から貪欲に詰める（O(枠数)）
+    if num_clips_needed == total_possible_clips and not any(vf.used_ranges for vf in video_files):
+        for video_file in video_files:
+            for start_time in video_file._grid_starts(clip_duration):
+                video_file.add_used_range(start_time, clip_duration)
+                selected_clips.append(ClipInfo(
+                    file=str(video_file.path),
+                    start=start_time,
+                    duration=clip_duration,
+                    file_timestamp=video_file.timestamp,
+                    fps=video_file.fps
+                ))
+            if verbose and video_file.used_ranges:
+                print(f"{video_file.path.name}: {len(video_file.used_ranges)}個のクリップを選択")
+    
+    # 各ファイルの残り時間と、まだクリップを取り出せるかをNumPy配列で保持
+    # （予約したファイルの要素だけを更新し、候補の抽出と重み付き抽選は配列演算で行う）
+    available = np.array([vf.get_available_duration() for vf in video_files], dtype=np.float64)
+    viable = np.array([vf.duration >= clip_duration for vf in video_files], dtype=bool)
+    
+    while len(selected_clips) < num_clips_needed and viable.any():
+        # ファイルをランダムに選択（残り時間に比例した重みで長い動画を優先）
+        cumulative = np.cumsum(np.where(viable, np.maximum(available, 0.0), 0.0))
+        if cumulative[-1] > 0:
+            index = int(np.searchsorted(cumulative, random.random() * cumulative[-1], side='right'))
+            index = min(index, len(video_files) - 1)
+        else:
+            index = int(random.choice(np.flatnonzero(viable)))
+        selected_file = video_files[index]
         
-        if not available_files:
-            break
+        start_time = selected_file.try_reserve_clip(clip_duration)
+        available[index] = selected_file.get_available_duration()
+        # 連続した空きがない、または残り時間が足りなくなったファイルは候補から外す
+        if start_time is None or available[index] < clip_duration + selected_file.min_gap:
+            viable[index] = False
+        if start_time is None:
+            continue
             
-        # ファイルをランダムに選択（長い動画を優先）
-        available_files.sort(key=lambda x: x.get_available_duration(), reverse=True)
-        selected_file = random.choice(available_files[:max(1, len(available_files) // 2)])
+        selected_clips.append(ClipInfo(
+            file=str(selected_file.path),
+            start=start_time,
+            duration=clip_duration,
+            file_timestamp=selected_file.timestamp,
+            fps=selected_file.fps
+        ))
         
-        try:
-            start_time = selected_file.find_available_position(clip_duration)
-            selected_file.add_used_range(start_time, clip_duration)
-            
-            selected_clips.append(ClipInfo(
-                file=str(selected_file.path),
-                start=start_time,
-                duration=clip_duration,
-                file_timestamp=selected_file.timestamp
-            ))
-            
-            print(f"クリップ {len(selected_clips)} の選択:")
-            print(f"ファイル: {selected_file.path.name}")
-            print(f"開始位置: {start_time:.1f}秒")
-            print(f"長さ: {clip_duration}秒")
-            print(f"残り必要クリップ数: {num_clips_needed - len(selected_clips)}\n")
-            
-        except ValueError as e:
-            print(f"警告: {selected_file.path.name} からのクリップ抽出に失敗: {e}")
-            continue
+        if verbose:
+            print(f"クリップ {len(selected_clips)} の選択:\n"
+                  f"ファイル: {selected_file.path.name}\n"
+                  f"開始位置: {start_time:.1f}秒\n"
+                  f"長さ: {clip_duration}秒\n"
+                  f"残り必要クリップ数: {num_clips_needed - len(selected_clips)}\n")
+    
+    print(f"{len(selected_clips)}個のクリップを選択しました")
     
     # タイムスタンプでソート
-    selected_clips.sort(key=lambda x: (x.file_timestamp, x.start))
+    selected_clips.sort(key=attrgetter('file_timestamp', 'start'))
     return selected_clips
 
+def score_candidates(features: np.ndarray, running_mean: Optional[np.ndarray], diversity_weight: float,
+                     remaining: Optional[np.ndarray] = None) -> np.ndarray:
+    """候補 × 特徴（シーン・動き・色）の行列から各候補の最終スコアを計算"""
+    # 品質スコアを計算（シーン変化と動きの組み合わせ）
+    quality_scores = features.mean(axis=1)
+    
+    # 多様性スコアを計算（選択済みクリップの特徴の平均との差の絶対値の平均）
+    if running_mean is not None:
+        diversity_scores = np.abs(features - running_mean).mean(axis=1)
+    else:
+        diversity_scores = np.zeros(len(features))
+    
+    # 最終スコアを計算（品質と多様性の加重平均）
+    final_scores = (1 - diversity_weight) * quality_scores + diversity_weight * diversity_scores
+    
+    # 候補のファイルの残り時間（最大値で正規化）に応じて加点し、長い動画を優先する
+    if remaining is not None and remaining.max() > 0:
+        final_scores += AVAILABILITY_WEIGHT * remaining / remaining.max()
+    return final_scores
+
 def select_clips_smart(video_files: List[VideoFile], clip_duration: float, total_duration: float, 
-                      diversity_weight: float = 0.5) -> List[ClipInfo]:
+                      diversity_weight: float = 0.5, verbose: bool = False) -> List[ClipInfo]:
     """スマートアルゴリズムを使用してクリップを選択"""
     print("\n=== スマートクリップ選択を使用 ===")
-    num_clips_needed = math.ceil(total_duration / clip_duration)
+    num_clips_needed = int(-(-total_duration // clip_duration))  # 切り上げ
     selected_clips = []
     
     # 各ファイルから抽出可能なクリップ数を計算
     file_potentials = []
     for video_file in video_files:
         if video_file.duration >= clip_duration:
-            max_clips = math.floor(video_file.duration / clip_duration)
+            max_clips = int(video_file.duration // clip_duration)
             file_potentials.append((video_file, max_clips))
     
     # 抽出可能なクリップの総数を確認
@@ -297,25 +664,27 @@ def select_clips_smart(video_files: List[VideoFile], clip_duration: float, total
                 start_time = (max_start / (samples - 1)) * i if samples > 1 else 0
             
             # セグメントを分析
-            features = analyze_video_segment(str(video_file.path), start_time, clip_duration)
+            features = analyze_video_segment(video_file, start_time, clip_duration, verbose)
             sample_features.append(features)
             
-            print(f"  {video_file.path.name} サンプル {i+1}/{samples}: "
-                  f"シーンスコア={features['scene_score']:.2f}, "
-                  f"動きスコア={features['motion_score']:.2f}, "
-                  f"色多様性={features['color_variance']:.2f}")
+            if verbose:
+                print(f"  {video_file.path.name} サンプル {i+1}/{samples}: "
+                      f"シーンスコア={features['scene_score']:.2f}, "
+                      f"動きスコア={features['motion_score']:.2f}, "
+                      f"色多様性={features['color_variance']:.2f}")
         
         # 平均特徴を計算
         avg_features = {
-            'scene_score': np.mean([f['scene_score'] for f in sample_features]),
-            'motion_score': np.mean([f['motion_score'] for f in sample_features]),
-            'color_variance': np.mean([f['color_variance'] for f in sample_features])
+            'scene_score': sum(f['scene_score'] for f in sample_features) / len(sample_features),
+            'motion_score': sum(f['motion_score'] for f in sample_features) / len(sample_features),
+            'color_variance': sum(f['color_variance'] for f in sample_features) / len(sample_features)
         }
         
         file_features[str(video_file.path)] = avg_features
     
-    # 選択済みクリップの特徴を追跡
-    selected_features = []
+    # 選択済みクリップの特徴の合計を追跡（平均をO(1)で求める）
+    sum_scene = sum_motion = sum_color = 0.0
+    n_selected = 0
     
     while len(selected_clips) < num_clips_needed:
         # 利用可能なファイルをフィルタリング
@@ -327,67 +696,29 @@ def select_clips_smart(video_files: List[VideoFile], clip_duration: float, total
         if not available_files:
             break
             
-        # 最適なファイルとクリップを選択
-        best_file = None
-        best_start_time = 0
-        best_score = -float('inf')
-        best_features = None
-        
-        # 各ファイルを評価
+        # 全ファイルの候補位置と特徴をまとめて集める（各ファイルで5つの候補位置を試す）
+        candidates = []
+        candidate_features = []
+        candidate_remaining = []
         for video_file in available_files:
-            # 複数の候補位置を評価
-            for _ in range(5):  # 各ファイルで5つの候補位置を試す
-                try:
-                    # 候補位置を取得
-                    start_time = video_file.find_available_position(clip_duration)
-                    
-                    # セグメントを分析
-                    features = analyze_video_segment(str(video_file.path), start_time, clip_duration)
-                    
-                    # 多様性スコアを計算（既存のクリップとの違い）
-                    diversity_score = 0
-                    if selected_features:
-                        # 各特徴の平均との差を計算
-                        avg_scene = np.mean([f['scene_score'] for f in selected_features])
-                        avg_motion = np.mean([f['motion_score'] for f in selected_features])
-                        avg_color = np.mean([f['color_variance'] for f in selected_features])
-                        
-                        # 差の絶対値を計算
-                        scene_diff = abs(features['scene_score'] - avg_scene)
-                        motion_diff = abs(features['motion_score'] - avg_motion)
-                        color_diff = abs(features['color_variance'] - avg_color)
-                        
-                        # 差を正規化して合計
-                        diversity_score = (scene_diff + motion_diff + color_diff) / 3
-                    
-                    # 品質スコアを計算（シーン変化と動きの組み合わせ）
-                    quality_score = (features['scene_score'] + features['motion_score'] + features['color_variance']) / 3
-                    
-                    # 最終スコアを計算（品質と多様性の加重平均）
-                    final_score = (1 - diversity_weight) * quality_score + diversity_weight * diversity_score
-                    
-                    # より良いスコアが見つかった場合は更新
-                    if final_score > best_score:
-                        best_score = final_score
-                        best_file = video_file
-                        best_start_time = start_time
-                        best_features = features
-                
-                except ValueError:
-                    continue
-        
-        # 最適なクリップが見つからなかった場合
-        if best_file is None:
-            # 通常の方法でファイルを選択
-            available_files.sort(key=lambda x: x.get_available_duration(), reverse=True)
-            best_file = random.choice(available_files[:max(1, len(available_files) // 2)])
-            
-            try:
-                best_start_time = best_file.find_available_position(clip_duration)
-                best_features = analyze_video_segment(str(best_file.path), best_start_time, clip_duration)
-            except ValueError as e:
-                print(f"警告: {best_file.path.name} からのクリップ抽出に失敗: {e}")
-                continue
+            remaining = video_file.get_available_duration()
+            # 空き範囲を1回だけ列挙して5つの候補位置をサンプリング
+            for start_time in video_file.sample_starts(clip_duration, 5):
+                # セグメントを分析
+                features = analyze_video_segment(video_file, start_time, clip_duration, verbose)
+                candidates.append((video_file, start_time, features))
+                candidate_features.append((features['scene_score'], features['motion_score'], features['color_variance']))
+                candidate_remaining.append(remaining)
+        
+        # 候補 × 特徴（シーン・動き・色）の行列で全候補のスコアを一括計算し、最適なクリップを選択
+        # （available_filesはクリップを抽出できるファイルのみのため、候補は必ず1つ以上ある）
+        running_mean = np.array([sum_scene, sum_motion, sum_color]) / n_selected if n_selected else None
+        final_scores = score_candidates(np.array(candidate_features, dtype=np.float64),
+                                        running_mean, diversity_weight,
+                                        np.array(candidate_remaining, dtype=np.float64))
+        best_index = int(final_scores.argmax())
+        best_file, best_start_time, best_features = candidates[best_index]
+        best_score = float(final_scores[best_index])
         
         # 選択したクリップを追加
         best_file.add_used_range(best_start_time, clip_duration)
@@ -399,49 +730,72 @@ def select_clips_smart(video_files: List[VideoFile], clip_duration: float, total
             file_timestamp=best_file.timestamp,
             scene_score=best_features['scene_score'],
             motion_score=best_features['motion_score'],
-            color_variance=best_features['color_variance']
+            color_variance=best_features['color_variance'],
+            fps=best_file.fps
         )
         
         selected_clips.append(clip_info)
-        selected_features.append(best_features)
-        
-        print(f"\nクリップ {len(selected_clips)} の選択 (スマート):")
-        print(f"ファイル: {best_file.path.name}")
-        print(f"開始位置: {best_start_time:.1f}秒")
-        print(f"長さ: {clip_duration}秒")
-        print(f"特徴: シーン={best_features['scene_score']:.2f}, "
-              f"動き={best_features['motion_score']:.2f}, "
-              f"色多様性={best_features['color_variance']:.2f}")
-        print(f"スコア: {best_score:.2f}")
-        print(f"残り必要クリップ数: {num_clips_needed - len(selected_clips)}\n")
+        sum_scene += best_features['scene_score']
+        sum_motion += best_features['motion_score']
+        sum_color += best_features['color_variance']
+        n_selected += 1
+        
+        if verbose:
+            print(f"\nクリップ {len(selected_clips)} の選択 (スマート):\n"
+                  f"ファイル: {best_file.path.name}\n"
+                  f"開始位置: {best_start_time:.1f}秒\n"
+                  f"長さ: {clip_duration}秒\n"
+                  f"特徴: シーン={best_features['scene_score']:.2f}, "
+                  f"動き={best_features['motion_score']:.2f}, "
+                  f"色多様性={best_features['color_variance']:.2f}\n"
+                  f"スコア: {best_score:.2f}\n"
+                  f"残り必要クリップ数: {num_clips_needed - len(selected_clips)}\n")
+    
+    print(f"{len(selected_clips)}個のクリップを選択しました")
     
     # タイムスタンプでソート
-    selected_clips.sort(key=lambda x: (x.file_timestamp, x.start))
+    selected_clips.sort(key=attrgetter('file_timestamp', 'start'))
     return selected_clips
 
-def detect_scene_changes(file_path: str, start_time: float, duration: float, min_scene_score: float = 0.3) -> List[float]:
+@lru_cache(maxsize=None)
+def probe_scene_changes(file_path: str, min_scene_score: float = 0.3) -> np.ndarray:
+    """ffmpegのシーン検出で動画全体のシーン変化時刻（秒）を取得（ファイルごとに1回だけ実行）"""
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostats',
+        '-i', file_path,
+        '-an',
+        '-filter:v', f"scale={SCENE_ANALYSIS_WIDTH}:-2,select='gt(scene,{min_scene_score})',showinfo",
+        '-f', 'null',
+        '-'
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, errors='replace', check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"警告: {Path(file_path).name} のシーン検出に失敗: {e}")
+        return np.empty(0)
+    times = [float(t) for t in _PTS_TIME_PATTERN.findall(proc.stderr)]
+    return np.sort(np.array(times, dtype=np.float64))
+
+def detect_scene_changes(file_path: str, start_time: float, duration: float, min_scene_score: float = 0.3,
+                         verbose: bool = False) -> List[float]:
     """動画内のシーン変化を検出し、最適な切り替えポイントを見つける"""
-    # 簡略化のため、ランダムなシーン変化ポイントを生成
-    scene_changes = []
-    
-    # クリップの長さに基づいて、ランダムなシーン変化ポイントを1〜3個生成
-    num_scenes = random.randint(1, 3)
-    for _ in range(num_scenes):
-        # 0からdurationの間でランダムな時間を生成
-        scene_time = random.uniform(0, duration)
-        scene_changes.append(scene_time)
+    # ファイル全体の検出結果から、クリップ範囲内のシーン変化だけを二分探索で取り出す
+    scene_times = probe_scene_changes(file_path, min_scene_score)
+    lo, hi = np.searchsorted(scene_times, [start_time, start_time + duration])
+    scene_changes = (scene_times[lo:hi] - start_time).tolist()
     
-    # 時間順にソート
-    scene_changes.sort()
-    
-    print(f"  シーン変化ポイント（簡略化）: {', '.join([f'{t:.1f}秒' for t in scene_changes])}")
+    if verbose:
+        print(f"  シーン変化ポイント: {', '.join([f'{t:.1f}秒' for t in scene_changes]) or 'なし'}")
     
     return scene_changes
 
-def find_optimal_transition_point(file_path: str, start_time: float, duration: float, min_scene_score: float = 0.3) -> float:
+def find_optimal_transition_point(file_path: str, start_time: float, duration: float, min_scene_score: float = 0.3,
+                                  verbose: bool = False) -> float:
     """クリップ内の最適な切り替えポイントを見つける"""
     # シーン変化を検出
-    scene_changes = detect_scene_changes(file_path, start_time, duration, min_scene_score)
+    scene_changes = detect_scene_changes(file_path, start_time, duration, min_scene_score, verbose)
     
     if scene_changes:
         # クリップの中央に最も近いシーン変化を選択
@@ -452,48 +806,53 @@ def find_optimal_transition_point(file_path: str, start_time: float, duration: f
     # シーン変化が見つからない場合はクリップの中央を返す
     return start_time + (duration / 2)
 
-def optimize_clip_transitions(clips: List[ClipInfo], min_scene_score: float = 0.3) -> List[ClipInfo]:
+def optimize_clip_transitions(clips: List[ClipInfo], min_scene_score: float = 0.3,
+                              verbose: bool = False) -> List[ClipInfo]:
     """クリップの切り替えポイントを最適化"""
     print("\n=== クリップの切り替えポイントを最適化 ===")
     optimized_clips = []
+    adjusted = 0
     
     for i, clip in enumerate(clips):
-        print(f"クリップ {i+1}/{len(clips)} の最適化中...")
+        if verbose:
+            print(f"クリップ {i+1}/{len(clips)} の最適化中...")
         
         # 最適な切り替えポイントを見つける
         optimal_start = find_optimal_transition_point(
             clip.file, 
             clip.start, 
             clip.duration, 
-            min_scene_score
+            min_scene_score,
+            verbose
         )
         
         # 元の開始位置と最適な開始位置の差を計算
         shift = optimal_start - clip.start
         
+        # 開始位置が変わらない場合はそのまま使う
+        if abs(shift) < 1e-6:
+            optimized_clips.append(clip)
+            continue
+        
         # 許容範囲内の場合のみ調整（クリップの長さの20%以内）
         max_shift = clip.duration * 0.2
         if abs(shift) <= max_shift:
-            # 新しいクリップ情報を作成
-            new_clip = ClipInfo(
-                file=clip.file,
-                start=optimal_start,
-                duration=clip.duration,
-                file_timestamp=clip.file_timestamp,
-                scene_score=getattr(clip, 'scene_score', 0.0),
-                motion_score=getattr(clip, 'motion_score', 0.0),
-                color_variance=getattr(clip, 'color_variance', 0.0)
-            )
+            # 開始位置だけを差し替えた新しいクリップ情報を作成
+            new_clip = clip._replace(start=optimal_start)
             
-            print(f"  最適化: {clip.start:.1f}秒 → {optimal_start:.1f}秒 (シフト: {shift:.1f}秒)")
+            if verbose:
+                print(f"  最適化: {clip.start:.1f}秒 → {optimal_start:.1f}秒 (シフト: {shift:.1f}秒)")
             optimized_clips.append(new_clip)
+            adjusted += 1
         else:
-            print(f"  最適化なし: シフト {shift:.1f}秒 が許容範囲を超えています")
+            if verbose:
+                print(f"  最適化なし: シフト {shift:.1f}秒 が許容範囲を超えています")
             optimized_clips.append(clip)
     
+    print(f"{len(clips)}個中{adjusted}個のクリップの開始位置を調整しました")
     return optimized_clips
 
-def create_timeline_from_clips(resolve, clips, project_name="Random Clips"):
+def create_timeline_from_clips(resolve, clips, project_name="Random Clips", verbose=False):
     """クリップからタイムラインを作成"""
     print("\n=== DaVinci Resolveプロジェクトの設定 ===")
     
@@ -521,7 +880,8 @@ def create_timeline_from_clips(resolve, clips, project_name="Random Clips"):
         return False
 
     # 新しいビンを作成
-    bin_name = f"Random Clips {datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    now_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')  # ビンとタイムラインで同じ時刻を使用
+    bin_name = f"Random Clips {now_stamp}"
     print(f"\nビン '{bin_name}' を作成中...")
     bin_obj = mediaPool.AddSubFolder(rootFolder, bin_name)
     if not bin_obj:
@@ -529,26 +889,41 @@ def create_timeline_from_clips(resolve, clips, project_name="Random Clips"):
         return False
     mediaPool.SetCurrentFolder(bin_obj)
 
-    # クリップをメディアプールに追加（1つずつ追加して順序を保持）
+    # 使用するファイルを1回のImportMedia呼び出しでまとめてメディアプールに追加
+    unique_files = list(dict.fromkeys(clip_info.file for clip_info in clips))
+    imported = mediaPool.ImportMedia(unique_files) or []
+    path_to_item = {}
+    for item in imported:
+        path_to_item[os.path.normcase(os.path.normpath(item.GetClipProperty('File Path')))] = item
+    # パスで対応付けられない場合、件数が一致していれば取り込み順で対応付ける
+    for index, file in enumerate(unique_files):
+        key = os.path.normcase(os.path.normpath(file))
+        if key not in path_to_item and len(imported) == len(unique_files):
+            path_to_item[key] = imported[index]
+    
+    # クリップ順を保持して取り込み済みのメディアと対応付け
     added_clips = []
-    print("\nクリップの順序:")
+    if verbose:
+        print("\nクリップの順序:")
     for i, clip_info in enumerate(clips, 1):
-        # 1つのクリップをメディアプールに追加
-        result = mediaPool.ImportMedia([clip_info.file])
-        if result and result[0]:
-            media_item = result[0]
+        media_item = path_to_item.get(os.path.normcase(os.path.normpath(clip_info.file)))
+        name = os.path.basename(clip_info.file)
+        if media_item:
             added_clips.append({
                 'clip': media_item,
                 'start': clip_info.start,
                 'duration': clip_info.duration,
-                'timestamp': clip_info.file_timestamp
+                'timestamp': clip_info.file_timestamp,
+                'fps': clip_info.fps,
+                'name': name
             })
-            print(f"{i}. {Path(clip_info.file).name} (timestamp: {clip_info.file_timestamp})")
+            if verbose:
+                print(f"{i}. {name} (timestamp: {clip_info.file_timestamp})")
         else:
-            print(f"❌ クリップ {i}: {Path(clip_info.file).name} の追加に失敗")
+            print(f"❌ クリップ {i}: {name} の追加に失敗")
 
     # タイムラインを作成
-    timeline_name = f"Random Timeline {datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    timeline_name = f"Random Timeline {now_stamp}"
     print(f"\nタイムライン '{timeline_name}' を作成中...")
     timeline = mediaPool.CreateEmptyTimeline(timeline_name)
     if not timeline:
@@ -560,28 +935,40 @@ def create_timeline_from_clips(resolve, clips, project_name="Random Clips"):
     timeline.SetSetting('timelineResolutionWidth', '3840')
     timeline.SetSetting('timelineResolutionHeight', '2160')
 
-    # クリップをタイムラインに追加
-    timeline_position = 0
-    print("\nタイムラインにクリップを追加:")
+    # ffprobeでフレームレートを取得できなかったメディアのみ、事前に1回だけResolveに問い合わせる
+    fps_cache = {}
+    for clip_info in added_clips:
+        media_item = clip_info['clip']
+        if not clip_info['fps'] and id(media_item) not in fps_cache:
+            fps_cache[id(media_item)] = float(media_item.GetClipProperty("FPS"))
+
+    # タイムラインに追加するクリップの一覧を作成
+    timeline_items = []
+    if verbose:
+        print("\nタイムラインにクリップを追加:")
     for i, clip_info in enumerate(added_clips, 1):
-        # クリップの実際のフレームレートを取得
-        clip_fps = float(clip_info['clip'].GetClipProperty("FPS"))
+        # クリップの実際のフレームレートを取得（ffprobeで取得済みならResolveに問い合わせない）
+        clip_fps = clip_info['fps'] or fps_cache[id(clip_info['clip'])]
         
         # クリップの開始・終了フレームを計算
         start_frame = int(clip_info['start'] * clip_fps)
         end_frame = int((clip_info['start'] + clip_info['duration']) * clip_fps)
         
-        print(f"{i}. {Path(clip_info['clip'].GetClipProperty('File Path')).name}")
-        print(f"   Frames: {start_frame}-{end_frame}")
+        if verbose:
+            print(f"{i}. {clip_info['name']}\n"
+                  f"   Frames: {start_frame}-{end_frame}")
         
-        mediaPool.AppendToTimeline([{
+        timeline_items.append({
             'mediaPoolItem': clip_info['clip'],
             'startFrame': start_frame,
             'endFrame': end_frame
-        }])
-        
-        # 次のクリップの開始位置を更新
-        timeline_position = end_frame
+        })
+    
+    # すべてのクリップを1回の呼び出しでタイムラインに追加
+    if not mediaPool.AppendToTimeline(timeline_items):
+        print("❌ タイムラインへのクリップ追加に失敗しました")
+        return False
+    print(f"{len(timeline_items)}個のクリップをタイムラインに追加しました")
     
     print("\n=== タイムラインの作成が完了しました ===")
     return True
@@ -605,6 +992,7 @@ def main():
         parser.add_argument('--detect-scenes', action='store_true', help='シーン検出を使用して最適な切り替え点を見つける')
         parser.add_argument('--min-scene-score', type=float, default=0.3, help='シーン検出の最小スコア（0.0-1.0）')
         parser.add_argument('--diversity-weight', type=float, default=0.5, help='クリップ選択の多様性の重み（0.0-1.0）')
+        parser.add_argument('--verbose', action='store_true', help='クリップごとの詳細を表示する')
         
         args = parser.parse_args()
 
@@ -613,29 +1001,41 @@ def main():
             print(f"エラー: 入力ディレクトリ {args.input_dir} が見つかりません")
             sys.exit(1)
 
-        # 対応する動画形式のパターンを定義
-        video_patterns = ["*.mp4", "*.MP4", "*.mov", "*.MOV", "*.avi", "*.AVI", "*.m4v", "*.M4V"]
-        
-        # すべてのパターンで動画ファイルを検索
-        video_files = []
-        for pattern in video_patterns:
-            video_files.extend(list(input_dir.glob(pattern)))
+        # 1回のディレクトリ走査で動画ファイルを検索（拡張子の大文字小文字は区別しない）
+        # os.scandirはディレクトリエントリの種別を保持しているため、ファイルごとのstatが不要
+        # ここで取得したstat結果はキャッシュキーとタイムスタンプ抽出で使い回す
+        with os.scandir(input_dir) as it:
+            video_entries = sorted(
+                ((Path(entry.path), entry.stat()) for entry in it
+                 if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS),
+                key=lambda e: e[0]
+            )
+        # シンボリックリンクなどで同じ実体を指すファイルは1つにまとめる
+        # （WindowsのDirEntry.statはst_inoが常に0のため、正規化した実パスで判定する）
+        unique_entries = {}
+        for path, st in video_entries:
+            unique_entries.setdefault(os.path.normcase(os.path.realpath(path)), (path, st))
+        video_entries = list(unique_entries.values())
+        video_files = [path for path, _ in video_entries]
         
         if not video_files:
             print(f"エラー: {args.input_dir} に動画ファイルが見つかりません")
-            print("対応している動画形式:", ", ".join(pattern[2:].upper() for pattern in video_patterns[::2]))
+            print("対応している動画形式:", ", ".join(ext[1:].upper() for ext in VIDEO_EXTENSIONS))
             sys.exit(1)
 
         print(f"\n処理開始: {len(video_files)}個の動画ファイルを検出")
         print("検出された動画形式:")
-        extensions = {f.suffix.lower() for f in video_files}
-        for ext in sorted(extensions):
-            count = sum(1 for f in video_files if f.suffix.lower() == ext)
+        ext_counts = Counter(f.suffix.lower() for f in video_files)
+        for ext, count in sorted(ext_counts.items()):
             print(f"  {ext}: {count}個")
         print()
 
-        # VideoFileオブジェクトを作成
-        video_file_objects = [VideoFile(path) for path in video_files]
+        # 動画の長さとフレームレートを並列に取得してからVideoFileオブジェクトを作成
+        infos = probe_all(video_files, [stat_result for _, stat_result in video_entries])
+        video_file_objects = [
+            VideoFile(path, info, stat_result)
+            for (path, stat_result), info in zip(video_entries, infos)
+        ]
         
         # スマート選択オプションが有効な場合は表示
         if args.smart_selection:
@@ -650,9 +1050,10 @@ def main():
         # クリップを選択（スマート選択が有効な場合はそちらを使用）
         if args.smart_selection:
             clips = select_clips_smart(video_file_objects, args.clip_duration, args.total_duration, 
-                                      diversity_weight=args.diversity_weight)
+                                      diversity_weight=args.diversity_weight, verbose=args.verbose)
         else:
-            clips = select_clips(video_file_objects, args.clip_duration, args.total_duration)
+            clips = select_clips(video_file_objects, args.clip_duration, args.total_duration,
+                                 verbose=args.verbose)
         
         if not clips:
             print("エラー: クリップを選択できませんでした")
@@ -660,10 +1061,11 @@ def main():
 
         # シーン検出が有効な場合、最適な切り替え点を検出
         if args.detect_scenes:
-            clips = optimize_clip_transitions(clips, min_scene_score=args.min_scene_score)
+            clips = optimize_clip_transitions(clips, min_scene_score=args.min_scene_score,
+                                              verbose=args.verbose)
 
         # タイムラインを作成
-        result = create_timeline_from_clips(resolve, clips)
+        result = create_timeline_from_clips(resolve, clips, verbose=args.verbose)
         if result:
             print("\nタイムラインの作成が完了しました")
         else:
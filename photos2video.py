@@ -1,30 +1,46 @@
 #!/usr/bin/env python3
 import os
+import math
 import argparse
 import cv2
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 import ffmpeg
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import ExifTags
 try:
     from pillow_heif import register_heif_opener
     # HEICファイルをPILで開けるようにする
     register_heif_opener()
     HEIF_SUPPORT = True
-    print("HEICファイルのサポートが有効です")
 except ImportError:
     HEIF_SUPPORT = False
-    print("警告: pillow-heifがインストールされていないため、HEICファイルはサポートされません")
-    print("HEICファイルをサポートするには: pip install pillow-heif")
 
-def create_blurred_background(img, target_width, target_height):
-    """ぼかし背景を作成する関数"""
-    # PILイメージをOpenCV形式に変換
-    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    
+# 出力動画のフレームレート
+FRAME_RATE = 24
+
+# 1回のFFmpeg実行で使うスレッド数（複数の画像を並列に処理するため少なめにする）
+FFMPEG_THREADS = 2
+
+# 背景のぼかしの強さ（拡大後の解像度でのガウスぼかしのシグマ）
+BLUR_SIGMA = 30
+# ぼかし処理を行う際の縮小率（縮小した画像をシグマも縮小してぼかし、元のサイズに戻す）
+BLUR_DOWNSCALE = 8
+
+def gaussian_kernel(sigma):
+    """1次元のガウスカーネルを作成（±3シグマで打ち切り）"""
+    ksize = int(6 * sigma) | 1  # 奇数にする
+    return cv2.getGaussianKernel(ksize, sigma).astype(np.float32)
+
+# ぼかしに使うカーネル（シグマは固定のため、モジュール読み込み時に一度だけ作成）
+BLUR_KERNEL = gaussian_kernel(BLUR_SIGMA / BLUR_DOWNSCALE)
+
+def create_blurred_background(img_array, target_width, target_height):
+    """ぼかし背景を作成する関数（RGBの配列を受け取り、RGBの配列を返す）"""
+    # ぼかしは各チャンネル独立に処理されるため、色の並びを変換せずにそのまま扱う
     # 画像のアスペクト比を保持しながら、目標サイズより大きくリサイズ
-    aspect = img_cv.shape[1] / img_cv.shape[0]
+    aspect = img_array.shape[1] / img_array.shape[0]
     if aspect > target_width / target_height:
         # 横長の画像
         new_height = int(target_height * 1.5)
@@ -37,44 +53,66 @@ def create_blurred_background(img, target_width, target_height):
     # リサイズ（幅と高さが2の倍数になるように調整）
     new_width = (new_width // 2) * 2
     new_height = (new_height // 2) * 2
-    scaled_img = cv2.resize(img_cv, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-    # ぼかし処理
-    blurred = cv2.GaussianBlur(scaled_img, (0, 0), 30)
+    # ぼかし処理（ぼかしは高周波成分を捨てるため、縮小した画像で行っても見た目は変わらない）
+    small_size = (max(1, new_width // BLUR_DOWNSCALE), max(1, new_height // BLUR_DOWNSCALE))
+    small = cv2.resize(img_array, small_size, interpolation=cv2.INTER_AREA)
+    # 横方向と縦方向の1次元畳み込みに分けて適用
+    blurred_small = cv2.sepFilter2D(small, -1, BLUR_KERNEL, BLUR_KERNEL, borderType=cv2.BORDER_DEFAULT)
     
-    # 中央部分を切り出し
+    # 拡大と中央部分の切り出しを1回のアフィン変換で行う（拡大後の全体の画像は作らない）
     start_x = (new_width - target_width) // 2
     start_y = (new_height - target_height) // 2
-    cropped = blurred[start_y:start_y+target_height, start_x:start_x+target_width]
+    scale_x = small_size[0] / new_width
+    scale_y = small_size[1] / new_height
+    # 出力の画素から縮小画像の座標への変換（cv2.resizeと同じく画素の中心を基準にする）
+    matrix = np.float32([[scale_x, 0, (start_x + 0.5) * scale_x - 0.5],
+                         [0, scale_y, (start_y + 0.5) * scale_y - 0.5]])
+    return cv2.warpAffine(blurred_small, matrix, (target_width, target_height),
+                          flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+def load_image(img_path, target_size=None):
+    """画像を開いてEXIFの回転情報を適用する関数（target_sizeを指定するとJPEGを縮小してデコード）"""
+    img = Image.open(img_path)
+    
+    # EXIFの回転情報を取得（5〜8は縦横が入れ替わる）
+    orientation = img.getexif().get(ExifTags.Base.Orientation)
+    
+    if target_size is not None:
+        # 回転後の向きで、目標サイズに収めるための縮小率を計算
+        width, height = img.size
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        scale = min(target_size[0] / width, target_size[1] / height)
+        if scale < 1:
+            # JPEGはDCT係数の段階で1/2〜1/8に縮小してデコードできる（指定した大きさ以上は保たれる）
+            img.draft('RGB', (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    
+    # EXIFの回転情報を適用（反転を含むすべての向きに対応）
+    img = ImageOps.exif_transpose(img)
     
-    return cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
+    return img
 
-def process_image(img_path, output_path, target_width=3840, target_height=2160, duration=5):
+def process_image(img_path, output_path, target_width=3840, target_height=2160, duration=5, force=False):
     """画像を処理して動画を作成する関数"""
-    print(f"画像を処理中: {img_path}")  # 処理状況を表示
+    # 1フレーム未満になる長さではloopフィルタの繰り返し回数が-1（無限）になるため受け付けない
+    frame_count = int(round(duration * FRAME_RATE))
+    if frame_count < 1:
+        raise ValueError(f"動画の長さが短すぎます: {duration}秒")
     
-    # 画像を開く（EXIFの回転情報を適用）
-    img = Image.open(img_path)
-    print(f"元画像サイズ: {img.size}")  # デバッグ情報
+    img_path = Path(img_path)
+    output_path = Path(output_path)
     
-    # EXIFの回転情報を適用
-    try:
-        for orientation in ExifTags.TAGS.keys():
-            if ExifTags.TAGS[orientation] == 'Orientation':
-                break
-        exif = img._getexif()
-        if exif is not None and orientation in exif:
-            if exif[orientation] == 3:
-                img = img.rotate(180, expand=True)
-                print("画像を180度回転")
-            elif exif[orientation] == 6:
-                img = img.rotate(270, expand=True)
-                print("画像を270度回転")
-            elif exif[orientation] == 8:
-                img = img.rotate(90, expand=True)
-                print("画像を90度回転")
-    except (AttributeError, KeyError, IndexError, TypeError) as e:
-        print(f"EXIF処理中のエラー: {e}")
-        pass
+    # 入力画像より新しい動画がすでにある場合は作り直さない
+    if not force and output_path.exists() and output_path.stat().st_mtime >= img_path.stat().st_mtime:
+        print(f"作成済みのためスキップ: {output_path}")
+        return
+    
+    print(f"画像を処理中: {img_path}")  # 処理状況を表示
+    
+    # 画像を開く（EXIFの回転情報を適用、JPEGは必要な大きさまで縮小してデコード）
+    img = load_image(img_path, (target_width, target_height))
+    print(f"読み込んだ画像サイズ: {img.size}")  # デバッグ情報
     
     # 画像のアスペクト比を計算
     aspect_ratio = img.width / img.height
@@ -95,88 +133,94 @@ def process_image(img_path, output_path, target_width=3840, target_height=2160,
     
     print(f"リサイズ後のサイズ: {new_width}x{new_height}")  # デバッグ情報
     
-    # 画像をリサイズ
-    img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    # 画像をリサイズ（PILを経由せずOpenCVで処理）
+    img_array = np.asarray(img.convert('RGB'))
+    img_resized = cv2.resize(img_array, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
     
     # 背景用の空の画像を作成（サイズを2の倍数に調整）
     background_width = (target_width // 2) * 2
     background_height = (target_height // 2) * 2
     try:
-        background = create_blurred_background(img, background_width, background_height)
-        background = Image.fromarray(background)
-        print(f"ぼかし背景のサイズ: {background.size}")  # デバッグ情報
+        frame = create_blurred_background(img_array, background_width, background_height)
+        print(f"ぼかし背景のサイズ: {frame.shape[1]}x{frame.shape[0]}")  # デバッグ情報
     except Exception as e:
         print(f"背景作成中のエラー: {e}")
         raise
     
-    # リサイズした画像を背景の中央に配置
+    # リサイズした画像を背景の中央に配置（配列のスライスに直接書き込む）
     x = (background_width - new_width) // 2
     y = (background_height - new_height) // 2
-    background.paste(img_resized, (x, y))
+    frame[y:y+new_height, x:x+new_width] = img_resized
     
-    # 一時的なフレーム画像を保存
-    temp_frame = output_path.with_suffix('.png')
-    try:
-        background.save(temp_frame)
-        print(f"一時ファイルを保存: {temp_frame}")  # デバッグ情報
-    except Exception as e:
-        print(f"一時ファイル保存中のエラー: {e}")
-        raise
+    # 合成したフレームをPNGに保存せず、生のRGBデータとしてFFmpegに渡す
     
     print(f"動画を生成中: {output_path}")  # 処理状況を表示
     
+    # 途中で中断された動画が作成済みと判定されないよう、一時ファイルに書き出してから置き換える
+    temp_path = output_path.with_name(output_path.name + '.part')
+    
     try:
-        # FFmpegを使用して動画を作成
-        stream = ffmpeg.input(str(temp_frame), loop=1, t=duration)
-        stream = ffmpeg.output(stream, str(output_path),
+        # FFmpegを使用して動画を作成（1フレームをloopフィルタで必要なフレーム数に複製）
+        stream = ffmpeg.input('pipe:', format='rawvideo', pix_fmt='rgb24',
+                              s=f'{frame.shape[1]}x{frame.shape[0]}', framerate=FRAME_RATE)
+        stream = stream.filter('loop', loop=frame_count - 1, size=1, start=0)
+        stream = ffmpeg.output(stream, str(temp_path),
+                             format='mp4',
                              vcodec='libx264',      # H.264コーデック
-                             preset='slow',         # 高品質設定
-                             video_bitrate='20M',   # 高ビットレート
+                             preset='veryfast',     # 全フレームが同じ静止画のため、動き探索に時間をかけても画質は変わらない
+                             tune='stillimage',     # 静止画向けの設定
+                             crf=18,                # 画質を固定（同じフレームの繰り返しはほぼ0ビットで符号化される）
+                             g=FRAME_RATE,          # 1秒ごとにキーフレーム
                              pix_fmt='yuv420p',     # QuickTime互換のピクセルフォーマット
                              movflags='+faststart', # ストリーミング最適化
-                             r=24)                  # フレームレート
+                             threads=FFMPEG_THREADS,
+                             r=FRAME_RATE,          # フレームレート
+                             **{'frames:v': frame_count})  # 出力するフレーム数の上限
         
         # FFmpegコマンドを表示
         print("FFmpegコマンド:")
         print(" ".join(ffmpeg.compile(stream)))
         
-        ffmpeg.run(stream, overwrite_output=True, capture_stderr=True)  # エラー出力をキャプチャ
+        process = ffmpeg.run_async(stream, pipe_stdin=True, pipe_stderr=True, overwrite_output=True)
+        _, stderr = process.communicate(input=frame.tobytes())  # エラー出力をキャプチャ
+        if process.returncode != 0:
+            raise ffmpeg.Error('ffmpeg', None, stderr)
+        os.replace(temp_path, output_path)
         print(f"動画生成完了: {output_path}")  # 完了を表示
     except ffmpeg.Error as e:
         print(f"動画生成エラー ({img_path} -> {output_path}):")
         print(e.stderr.decode())  # FFmpegのエラーメッセージを表示
-        # エラー時は一時ファイルを保持
-        print(f"デバッグ用に一時ファイルを保持: {temp_frame}")
-        return
     except Exception as e:
         print(f"その他のエラー ({img_path} -> {output_path}): {str(e)}")
-        # エラー時は一時ファイルを保持
-        print(f"デバッグ用に一時ファイルを保持: {temp_frame}")
-        return
-        
-    # 成功時のみ一時ファイルを削除
-    os.remove(temp_frame)
+    finally:
+        # 失敗した場合は書きかけの一時ファイルを削除
+        if temp_path.exists():
+            temp_path.unlink()
 
-def main():
-    parser = argparse.ArgumentParser(description='写真から動画を作成するスクリプト')
-    parser.add_argument('input_dir', help='入力フォルダのパス')
-    parser.add_argument('output_dir', help='出力フォルダのパス')
-    parser.add_argument('--duration', type=int, default=5, help='動画の長さ（秒）')
-    args = parser.parse_args()
+def generate_videos(input_dir, output_dir, duration=5, jobs=None, force=False):
+    """入力フォルダ内の画像をすべて動画に変換する（フォルダ構造を維持）"""
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
     
-    input_dir = Path(args.input_dir)
-    output_dir = Path(args.output_dir)
-    
-    # 入力フォルダ内のすべての画像ファイルを処理（大文字小文字を区別しない）
-    image_files = []
-    # JPG/JPEG画像を検索
-    for ext in ['*.jpg', '*.JPG', '*.jpeg', '*.JPEG']:
-        image_files.extend(list(input_dir.rglob(ext)))
+    # HEICファイルのサポート状況を表示（並列処理の各プロセスでも読み込まれるため、インポート時には表示しない）
+    if HEIF_SUPPORT:
+        print("HEICファイルのサポートが有効です")
+    else:
+        print("警告: pillow-heifがインストールされていないため、HEICファイルはサポートされません")
+        print("HEICファイルをサポートするには: pip install pillow-heif")
     
-    # HEICファイルのサポートが有効な場合、HEICファイルも検索
+    # 対象の拡張子（HEICファイルのサポートが有効な場合はHEICも含める）
+    extensions = {'.jpg', '.jpeg'}
     if HEIF_SUPPORT:
-        for ext in ['*.heic', '*.HEIC']:
-            image_files.extend(list(input_dir.rglob(ext)))
+        extensions.add('.heic')
+    
+    # 入力フォルダを1回だけ走査し、拡張子を小文字にして判定（大文字小文字を区別しない）
+    image_files = [
+        Path(dirpath) / filename
+        for dirpath, _, filenames in os.walk(input_dir)
+        for filename in filenames
+        if os.path.splitext(filename)[1].lower() in extensions
+    ]
     
     if not image_files:
         print(f"警告: {input_dir}内に対応画像が見つかりませんでした。")
@@ -188,19 +232,44 @@ def main():
         
     print(f"合計{len(image_files)}枚の画像を処理します。")
     
-    for img_path in image_files:
-        # 出力パスを作成（フォルダ構造を維持）
-        relative_path = img_path.relative_to(input_dir)
-        output_path = output_dir / relative_path.parent / relative_path.stem
-        output_path = output_path.with_suffix('.mp4')
-        
-        # 出力ディレクトリが存在しない場合は作成
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    # 画像ごとの処理を複数プロセスで並列実行
+    jobs = jobs or max(1, (os.cpu_count() or 1) // FFMPEG_THREADS)
+    print(f"並列処理数: {jobs}")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for img_path in image_files:
+            # 出力パスを作成（フォルダ構造を維持）
+            relative_path = img_path.relative_to(input_dir)
+            output_path = output_dir / relative_path.parent / relative_path.stem
+            output_path = output_path.with_suffix('.mp4')
+            
+            # 出力ディレクトリが存在しない場合は作成
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            futures[executor.submit(process_image, img_path, output_path,
+                                     duration=duration, force=force)] = img_path
         
-        try:
-            process_image(img_path, output_path, duration=args.duration)
-        except Exception as e:
-            print(f'エラー ({img_path}): {str(e)}')
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f'エラー ({futures[future]}): {str(e)}')
+
+def main():
+    parser = argparse.ArgumentParser(description='写真から動画を作成するスクリプト')
+    parser.add_argument('input_dir', help='入力フォルダのパス')
+    parser.add_argument('output_dir', help='出力フォルダのパス')
+    parser.add_argument('--duration', type=int, default=5, help='動画の長さ（秒）')
+    parser.add_argument('--jobs', type=int,
+                        help=f'同時に処理する画像数（デフォルト: CPUコア数/{FFMPEG_THREADS}）')
+    parser.add_argument('--force', action='store_true',
+                        help='作成済みの動画も作り直す')
+    args = parser.parse_args()
+    if args.duration <= 0:
+        parser.error('--durationには1以上の秒数を指定してください')
+    
+    generate_videos(args.input_dir, args.output_dir, duration=args.duration, jobs=args.jobs,
+                    force=args.force)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file